@@ -4,6 +4,19 @@
 import yaml
 import argparse
 import struct
+import json
+import os
+import operator
+import tempfile
+
+try:
+    from yaml import CSafeLoader as _Loader  # libyaml, если доступен
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+# Упаковщики (big-endian) для форматов полей, которые возвращают кодировщики:
+# 'H' - 2-байтовая команда, 'BI' - 5-байтовая sqrt
+_structs = {fmt: struct.Struct('>' + fmt) for fmt in ('H', 'BI')}
 
 class Assembler:
     def __init__(self):
@@ -13,95 +26,185 @@ class Assembler:
             'write_mem': 2,
             'sqrt': 1
         }
+        
+        # Допустимый максимум операнда и сообщение об ошибке для каждой команды
+        self.operand_limits = {
+            'load_const': (8191, "Константа {} вне диапазона 0-8191"),  # 13 бит
+            'read_mem': (2047, "Смещение {} вне диапазона 0-2047"),  # 11 бит
+            'write_mem': (2047, "Смещение {} вне диапазона 0-2047"),  # 11 бит
+            'sqrt': (0x3FFFFFFF, "Адрес {} вне диапазона 0-1073741823")  # 30 бит
+        }
+        
+        # Таблица кодировщиков команд
+        self._enc = {
+            'load_const': self._enc_2byte,
+            'read_mem': self._enc_2byte,
+            'write_mem': self._enc_2byte,
+            'sqrt': self._enc_sqrt
+        }
     
     def parse_yaml(self, yaml_file):
-        """Парсинг YAML-файла с программой"""
+        """Парсинг YAML-файла с программой (с JSON-кэшем рядом с исходником)"""
+        cache_file = yaml_file + '.jsoncache'
+        try:
+            if os.path.getmtime(cache_file) > os.path.getmtime(yaml_file):
+                with open(cache_file, 'r') as f:
+                    return json.load(f)
+        except (OSError, ValueError):  # Кэша нет или он поврежден - читаем YAML
+            pass
+        
         with open(yaml_file, 'r') as f:
-            program = yaml.safe_load(f)
+            program = yaml.load(f, Loader=_Loader)
+        
+        if self._cacheable(program):
+            self._write_cache(cache_file, program)
         return program
     
+    def _cacheable(self, program):
+        """Проверка, что программа переживет JSON без изменений"""
+        # JSON превращает любые ключи в строки, поэтому кэшируется только
+        # список инструкций {строка: целое}
+        return isinstance(program, list) and all(
+            isinstance(instr, dict) and len(instr) == 1
+            and all(isinstance(op, str) and isinstance(value, int)
+                    for op, value in instr.items())
+            for instr in program)
+    
+    def _write_cache(self, cache_file, program):
+        """Атомарная запись JSON-кэша программы"""
+        # Кэш пишется во временный файл рядом и подменяется целиком, чтобы
+        # прерванная или параллельная запись не оставила частичный файл.
+        # Кэш необязателен: если записать не удалось, просто работаем без него
+        try:
+            fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file) or '.',
+                                            prefix=os.path.basename(cache_file),
+                                            suffix='.tmp')
+        except OSError:
+            return
+        
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(program, f)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+    
+    def check_operand(self, op, value):
+        """Проверка типа и диапазона операнда команды"""
+        if not isinstance(value, int):
+            raise ValueError(f"Операнд {value!r} команды {op} должен быть целым числом")
+        limit, message = self.operand_limits[op]
+        if value < 0 or value > limit:
+            raise ValueError(message.format(value))
+    
+    def _enc_2byte(self, opcode, value):
+        """Формат и поля 2-байтовой команды (load_const, read_mem, write_mem)"""
+        # Формат: [AAAAABBB BBBBBBBB] - одно 16-битное слово
+        return 'H', ((opcode << 13) | (value & 0x1FFF),)
+    
+    def _enc_sqrt(self, opcode, value):
+        """Формат и поля 5-байтовой команды sqrt"""
+        # Биты 0-2: A=1, Биты 3-32: адрес, последний байт заполнен нулями
+        return 'BI', ((opcode << 5) | ((value >> 24) & 0x1F), (value & 0xFFFFFF) << 8)
+    
+    def _encode(self, op, opcode, value):
+        """Байты одной проверенной инструкции"""
+        fmt, fields = self._enc[op](opcode, value)
+        return _structs[fmt].pack(*fields)
+    
+    def split_instruction(self, instruction):
+        """Разбор инструкции на команду, ее код и операнд"""
+        # Инструкция - словарь из одной пары {команда: операнд}
+        if not isinstance(instruction, dict) or len(instruction) != 1:
+            raise ValueError("Инструкция должна содержать ровно одну команду")
+        op, value = next(iter(instruction.items()))
+        opcode = self.opcodes.get(op)
+        if opcode is None:
+            raise ValueError(f"Неизвестная команда {op}")
+        return op, opcode, value
+    
     def assemble_instruction(self, instruction):
         """Ассемблирование одной инструкции"""
-        for op, value in instruction.items():
-            if op in self.opcodes:
-                opcode = self.opcodes[op]
-                
-                if op == 'load_const':
-                    # Команда 4: загрузка константы (2 байта)
-                    # Биты 0-2: A=4, Биты 3-15: константа
-                    if value < 0 or value > 8191:  # 13 бит
-                        raise ValueError(f"Константа {value} вне диапазона 0-8191")
-                    
-                    # Формат: [AAAAABBB BBBBBBBB]
-                    byte1 = (opcode << 5) | (value >> 8) & 0x1F
-                    byte2 = value & 0xFF
-                    return bytes([byte1, byte2])
-                
-                elif op == 'read_mem':
-                    # Команда 7: чтение из памяти (2 байта)
-                    # Биты 0-2: A=7, Биты 3-13: смещение
-                    if value < 0 or value > 2047:  # 11 бит
-                        raise ValueError(f"Смещение {value} вне диапазона 0-2047")
-                    
-                    byte1 = (opcode << 5) | (value >> 8) & 0x1F
-                    byte2 = value & 0xFF
-                    return bytes([byte1, byte2])
-                
-                elif op == 'write_mem':
-                    # Команда 2: запись в память (2 байта)
-                    # Биты 0-2: A=2, Биты 3-13: смещение
-                    if value < 0 or value > 2047:  # 11 бит
-                        raise ValueError(f"Смещение {value} вне диапазона 0-2047")
-                    
-                    byte1 = (opcode << 5) | (value >> 8) & 0x1F
-                    byte2 = value & 0xFF
-                    return bytes([byte1, byte2])
-                
-                elif op == 'sqrt':
-                    # Команда 1: sqrt (5 байт)
-                    # Биты 0-2: A=1, Биты 3-32: адрес
-                    if value < 0 or value > 0x3FFFFFFF:  # 30 бит
-                        raise ValueError(f"Адрес {value} вне диапазона 0-1073741823")
-                    
-                    # Формируем 5 байт
-                    byte1 = (opcode << 5) | ((value >> 24) & 0x1F)
-                    byte2 = (value >> 16) & 0xFF
-                    byte3 = (value >> 8) & 0xFF
-                    byte4 = value & 0xFF
-                    byte5 = 0x00  # Заполняем нулями
-                    return bytes([byte1, byte2, byte3, byte4, byte5])
+        op, opcode, value = self.split_instruction(instruction)
+        self.check_operand(op, value)
+        return self._encode(op, opcode, value)
+    
+    def encode_program(self, names, operands):
+        """Пакетное кодирование программы, заданной списками команд и операндов"""
+        # Поля берутся у тех же кодировщиков, что и для одной инструкции,
+        # и упаковываются все разом одним вызовом struct.pack
+        enc = self._enc
+        opcodes = self.opcodes
+        fmt = ['>']
+        fields = []
+        for op, value in zip(names, operands):
+            op_fmt, op_fields = enc[op](opcodes[op], value)
+            fmt.append(op_fmt)
+            fields.extend(op_fields)
+        return struct.pack(''.join(fmt), *fields)
     
     def assemble(self, program, output_file, test_mode=False):
         """Ассемблирование всей программы"""
-        binary_code = b''
-        intermediate_rep = []
+        # Раскладываем программу в параллельные списки команд и операндов
+        names = []
+        opcodes = []
+        operands = []
         
         for i, instr in enumerate(program):
             try:
-                binary = self.assemble_instruction(instr)
-                binary_code += binary
-                
-                # Сохраняем промежуточное представление для тестирования
-                for op, value in instr.items():
-                    intermediate_rep.append({
-                        'index': i,
-                        'opcode': self.opcodes[op],
-                        'operand': value,
-                        'bytes': binary.hex()
-                    })
-                    
-                    if test_mode:
-                        print(f"Инструкция {i}: {op} {value}")
-                        print(f"  Байты: {' '.join([f'0x{b:02X}' for b in binary])}")
-                        
+                op, opcode, value = self.split_instruction(instr)
             except Exception as e:
                 print(f"Ошибка в инструкции {i}: {instr}")
                 print(f"Ошибка: {e}")
                 return False
+            
+            names.append(op)
+            opcodes.append(opcode)
+            operands.append(value)
+        
+        # Типы и диапазоны всех операндов проверяются разом; ошибочная
+        # инструкция ищется по одной, только если общая проверка не прошла
+        bounds = [self.operand_limits[op][0] for op in names]
+        valid = (set(map(type, operands)) <= {int, bool}
+                 and min(operands, default=0) >= 0
+                 and not any(map(operator.gt, operands, bounds)))
+        
+        if not valid:
+            for i, (op, value) in enumerate(zip(names, operands)):
+                try:
+                    self.check_operand(op, value)
+                except Exception as e:
+                    print(f"Ошибка в инструкции {i}: {program[i]}")
+                    print(f"Ошибка: {e}")
+                    return False
+        
+        binary_code = self.encode_program(names, operands)
+        
+        # Промежуточное представление нужно только в режиме тестирования
+        intermediate_rep = []
+        if test_mode:
+            for i, (op, opcode, value) in enumerate(zip(names, opcodes, operands)):
+                binary = self._encode(op, opcode, value)
+                
+                intermediate_rep.append({
+                    'index': i,
+                    'opcode': opcode,
+                    'operand': value,
+                    'bytes': binary.hex()
+                })
+                
+                print(f"Инструкция {i}: {op} {value}")
+                print(f"  Байты: {' '.join([f'0x{b:02X}' for b in binary])}")
         
-        # Сохраняем бинарный файл
-        with open(output_file, 'wb') as f:
-            f.write(binary_code)
+        # Сохраняем бинарный файл без промежуточного буфера; небуферизованная
+        # запись может оказаться частичной, поэтому пишем до конца
+        with open(output_file, 'wb', buffering=0) as f:
+            view = memoryview(binary_code)
+            while view:
+                view = view[f.write(view):]
         
         # Выводим промежуточное представление в тестовом режиме
         if test_mode:
@@ -0,0 +1,23 @@
+# interpreter.pxd
+# Объявления типов для сборки interpreter.py через Cython (см. setup.py).
+# Без Cython файл не используется, интерпретатор работает как обычный модуль.
+
+import cython
+
+cdef class UVMInterpreter:
+    cdef public object data_memory, stack, program
+    cdef public Py_ssize_t sp, pc
+    cdef public bint running
+    cdef Py_ssize_t _mem_len, _prog_len, _end_pc
+    cdef list _ops, _operands, _pcs
+
+    @cython.locals(program='const unsigned char[::1]', size=Py_ssize_t,
+                   pc=Py_ssize_t, next_pc=Py_ssize_t, first_byte=int,
+                   opcode=int, operand='long long')
+    cpdef predecode(self)
+
+    @cython.locals(stack=list, memory='long long[::1]', count=Py_ssize_t,
+                   sp=Py_ssize_t, stack_size=Py_ssize_t, mem_size=Py_ssize_t,
+                   opcode=int, operand='long long', addr='long long',
+                   value='long long')
+    cpdef tuple _execute(self, list ops, list operands, Py_ssize_t i)
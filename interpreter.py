@@ -5,134 +5,195 @@ import struct
 import csv
 import argparse
 import math
-from collections import deque
+import mmap
+from array import array
+from bisect import bisect_left
+
+# Чтение 16- и 32-битных слов (big-endian) из буфера программы
+_unpack_h = struct.Struct('>H').unpack_from
+_unpack_i = struct.Struct('>I').unpack_from
 
 class UVMInterpreter:
     def __init__(self):
-        self.data_memory = [0] * 65536  # Память данных (64K слов)
-        self.stack = deque()
+        self.data_memory = array('q', [0]) * 65536  # Память данных (64K слов по 64 бита)
+        self._mem_len = len(self.data_memory)
+        self.stack = [0] * 1024  # Стек (1024 слова)
+        self.sp = 0  # Указатель вершины стека
         self.pc = 0  # Счетчик команд
         self.running = True
         
     def load_program(self, program_file):
         """Загрузка бинарной программы"""
         with open(program_file, 'rb') as f:
-            self.program = f.read()
-        return len(self.program)
+            # Файл отображается в память, страницы подгружаются по мере чтения
+            try:
+                self.program = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Пустой файл отобразить нельзя
+                self.program = b''
+        self._prog_len = len(self.program)
+        
+        self.predecode()
+        return self._prog_len
+    
+    def predecode(self):
+        """Однократное декодирование всей программы в списки команд и операндов"""
+        program = self.program
+        size = self._prog_len
+        ops = []
+        operands = []
+        pcs = []  # Адрес каждой инструкции в программе
+        
+        pc = 0
+        while pc < size:
+            first_byte = program[pc]
+            opcode = first_byte >> 5  # Биты 0-2
+            
+            if opcode == 1:  # sqrt, 5 байт
+                if pc + 5 > size:
+                    break
+                operand = _unpack_i(program, pc)[0] & 0x1FFFFFFF
+                next_pc = pc + 5
+            elif opcode in (2, 4, 7) and pc + 2 <= size:  # 2 байта
+                operand = ((first_byte & 0x1F) << 8) | program[pc + 1]
+                next_pc = pc + 2
+            elif opcode in (2, 4, 7):  # Обрезанная последняя команда
+                break
+            else:
+                # Неизвестный код сохраняется, чтобы run сообщил о нем
+                # как об ошибке выполнения; дальше декодировать нельзя
+                ops.append(opcode)
+                operands.append(0)
+                pcs.append(pc)
+                break
+            
+            ops.append(opcode)
+            operands.append(operand)
+            pcs.append(pc)
+            pc = next_pc
+        
+        self._ops = ops
+        self._operands = operands
+        self._pcs = pcs
+        self._end_pc = pc  # Адрес, на котором декодирование остановилось
     
     def decode_instruction(self):
         """Декодирование текущей инструкции"""
-        if self.pc >= len(self.program):
+        pc = self.pc
+        if pc >= self._prog_len:
             return None, None
         
         # Читаем первый байт для определения типа команды
-        first_byte = self.program[self.pc]
-        opcode = (first_byte >> 5) & 0x07  # Биты 0-2
+        opcode = self.program[pc] >> 5  # Биты 0-2
         
-        if opcode == 4:  # load_const
-            # 2-байтовая команда
-            if self.pc + 2 > len(self.program):
+        if opcode == 1:  # sqrt
+            # 5-байтовая команда
+            if pc + 5 > self._prog_len:
                 return None, None
-            second_byte = self.program[self.pc + 1]
-            operand = ((first_byte & 0x1F) << 8) | second_byte
-            return 4, operand
+            
+            # Операнд - младшие 29 бит первых четырех байт
+            operand = _unpack_i(self.program, pc)[0] & 0x1FFFFFFF
+            return 1, operand
         
-        elif opcode == 7:  # read_mem
-            # 2-байтовая команда
-            if self.pc + 2 > len(self.program):
+        if opcode in (2, 4, 7):  # write_mem, load_const, read_mem
+            # 2-байтовая команда, операнд - младшие 13 бит слова
+            if pc + 2 > self._prog_len:
                 return None, None
-            second_byte = self.program[self.pc + 1]
-            operand = ((first_byte & 0x1F) << 8) | second_byte
-            return 7, operand
+            operand = _unpack_h(self.program, pc)[0] & 0x1FFF
+            return opcode, operand
         
-        elif opcode == 2:  # write_mem
-            # 2-байтовая команда
-            if self.pc + 2 > len(self.program):
-                return None, None
-            second_byte = self.program[self.pc + 1]
-            operand = ((first_byte & 0x1F) << 8) | second_byte
-            return 2, operand
+        raise Exception(f"Неизвестный код операции {opcode} по адресу {pc}")
+    
+    def _execute(self, ops, operands, i):
+        """Выполнение декодированных команд, начиная с номера i
         
-        elif opcode == 1:  # sqrt
-            # 5-байтовая команда
-            if self.pc + 5 > len(self.program):
-                return None, None
-            
-            # Собираем 30-битный операнд
-            b1 = self.program[self.pc]
-            b2 = self.program[self.pc + 1]
-            b3 = self.program[self.pc + 2]
-            b4 = self.program[self.pc + 3]
-            
-            operand = ((b1 & 0x1F) << 24) | (b2 << 16) | (b3 << 8) | b4
-            return 1, operand
+        Возвращает номер первой невыполненной команды и ошибку (или None).
+        Это единственное место, где задан смысл команд: им пользуются и run,
+        и пошаговое execute_instruction
+        """
+        # Атрибуты вынесены в локальные переменные
+        count = len(ops)
+        memory = self.data_memory
+        stack = self.stack
+        stack_size = len(stack)
+        mem_size = self._mem_len
+        sp = self.sp
+        error = None
         
-        return None, None
+        try:
+            while i < count:
+                opcode = ops[i]
+                operand = operands[i]
+                
+                if opcode == 4:  # load_const
+                    if sp == stack_size:
+                        raise Exception("Переполнение стека")
+                    stack[sp] = operand
+                    sp += 1
+                
+                elif opcode == 7:  # read_mem
+                    if sp == 0:
+                        raise Exception("Стек пуст для чтения")
+                    # Значение заменяет адрес на вершине, глубина стека не меняется
+                    addr = stack[sp - 1] + operand
+                    if not 0 <= addr < mem_size:
+                        raise Exception(f"Неверный адрес памяти: {addr}")
+                    stack[sp - 1] = memory[addr]
+                
+                elif opcode == 2:  # write_mem
+                    if sp == 0:
+                        raise Exception("Стек пуст для записи")
+                    sp -= 1
+                    value = stack[sp]
+                    if sp == 0:
+                        raise Exception("Стек пуст для адреса")
+                    sp -= 1
+                    addr = stack[sp] + operand
+                    if not 0 <= addr < mem_size:
+                        raise Exception(f"Неверный адрес памяти: {addr}")
+                    memory[addr] = value
+                
+                elif opcode == 1:  # sqrt
+                    if sp == 0:
+                        raise Exception("Стек пуст для sqrt")
+                    sp -= 1
+                    value = stack[sp]
+                    if value < 0:
+                        raise Exception("Корень из отрицательного числа")
+                    if not 0 <= operand < mem_size:
+                        raise Exception(f"Неверный адрес памяти: {operand}")
+                    memory[operand] = math.isqrt(value)
+                
+                else:
+                    raise Exception(f"Неизвестный код операции {opcode}")
+                
+                i += 1
+                
+        except Exception as e:
+            error = e
+        
+        self.sp = sp
+        return i, error
     
     def execute_instruction(self, opcode, operand):
         """Выполнение одной инструкции"""
-        if opcode == 4:  # load_const
-            self.stack.append(operand)
-            self.pc += 2
-            
-        elif opcode == 7:  # read_mem
-            if not self.stack:
-                raise Exception("Стек пуст для чтения")
-            
-            addr = self.stack.pop() + operand
-            if 0 <= addr < len(self.data_memory):
-                value = self.data_memory[addr]
-                self.stack.append(value)
-            else:
-                raise Exception(f"Неверный адрес памяти: {addr}")
-            self.pc += 2
-            
-        elif opcode == 2:  # write_mem
-            if not self.stack:
-                raise Exception("Стек пуст для записи")
-            
-            value = self.stack.pop()
-            if not self.stack:
-                raise Exception("Стек пуст для адреса")
-            
-            addr = self.stack.pop() + operand
-            if 0 <= addr < len(self.data_memory):
-                self.data_memory[addr] = value
-            else:
-                raise Exception(f"Неверный адрес памяти: {addr}")
-            self.pc += 2
-            
-        elif opcode == 1:  # sqrt
-            if not self.stack:
-                raise Exception("Стек пуст для sqrt")
-            
-            value = self.stack.pop()
-            if value < 0:
-                raise Exception("Корень из отрицательного числа")
-            
-            result = int(math.sqrt(value))
-            
-            if 0 <= operand < len(self.data_memory):
-                self.data_memory[operand] = result
-            else:
-                raise Exception(f"Неверный адрес памяти: {operand}")
-            self.pc += 5
-            
-        else:
-            self.running = False
+        _, error = self._execute([opcode], [operand], 0)
+        if error is not None:
+            raise error
+        self.pc += 5 if opcode == 1 else 2
     
     def run(self):
         """Основной цикл интерпретации"""
-        while self.running and self.pc < len(self.program):
-            opcode, operand = self.decode_instruction()
-            if opcode is None:
-                break
-            
-            try:
-                self.execute_instruction(opcode, operand)
-            except Exception as e:
-                print(f"Ошибка выполнения по адресу {self.pc}: {e}")
-                break
+        # Программа уже декодирована в predecode: выполнение идет по номерам
+        # инструкций, начиная с той, на которую указывает pc
+        if not self.running:
+            return
+        
+        pcs = self._pcs
+        i, error = self._execute(self._ops, self._operands, bisect_left(pcs, self.pc))
+        if error is not None:
+            print(f"Ошибка выполнения по адресу {pcs[i]}: {error}")
+        
+        self.pc = pcs[i] if i < len(pcs) else self._end_pc
     
     def dump_memory(self, filename, mem_range):
         """Создание дампа памяти в CSV"""
@@ -142,8 +203,9 @@ class UVMInterpreter:
             writer = csv.writer(f)
             writer.writerow(['address', 'value'])
             
-            for addr in range(start, min(end + 1, len(self.data_memory))):
-                writer.writerow([addr, self.data_memory[addr]])
+            # Все строки записываются одним вызовом writerows
+            stop = min(end + 1, self._mem_len)
+            writer.writerows(zip(range(start, stop), self.data_memory[start:stop]))
         
         print(f"Дамп памяти сохранен в {filename} (адреса {start}-{end})")
 